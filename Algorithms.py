@@ -3,31 +3,135 @@
 # - Reservation rules
 # - Training phase updates
 # - Multi-criteria search
+# - Sorted and top-k search results
+# - Removing, renaming and updating animals without rebuilding the indexes
+# - Journaling changes so they can be replayed on startup
+# - Finding animals with similar physical attributes
 
 
-from typing import List, Dict, Optional
+import heapq
+import inspect
+import threading
+from bisect import bisect_left, insort
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from RescueAnimal import RescueAnimal
 from Dog import Dog
 from Monkey import Monkey
+from Journal import Journal
+from Similarity import FEATURES, SimilarityIndex, animal_kind
+
+
+# Turn an MM-DD-YYYY acquisition date into a (year, month, day) tuple so dates sort chronologically
+def acquisition_date_key(animal: RescueAnimal):
+    mm, dd, yyyy = animal.acquisition_date.split("-")
+    return int(yyyy), int(mm), int(dd)
+
+
+# Fields that search results can be ordered by. Measurements only exist on monkeys.
+ORDER_KEYS: Dict[str, Callable[[RescueAnimal], object]] = {
+    "age": lambda a: a.age,
+    "weight": lambda a: a.weight,
+    "acquisition_date": acquisition_date_key,
+    "name": lambda a: a.name.lower(),
+    "tail_length": lambda a: a.tail_length,
+    "height": lambda a: a.height,
+    "body_length": lambda a: a.body_length,
+}
+MONKEY_ONLY_KEYS = ("tail_length", "height", "body_length")
 
 
 class Algorithms:
-    def __init__(self, dogs: List[Dog], monkeys: List[Monkey]):
+    def __init__(
+            self, dogs: List[Dog], monkeys: List[Monkey], indexed_fields: Iterable[str] = (),
+            journal: Optional[Journal] = None):
         # store in memory lists
         self.dogs = dogs
         self.monkeys = monkeys
 
+        # Optional write-ahead journal, every change is appended to it while the lock is held
+        self.journal = journal
+        self.lock = threading.RLock()
+
         # Dictionary index for quickly looking for animal
         self.name_index: Dict[str, RescueAnimal] = {}
+
+        # Position of each animal in its dogs/monkeys list so removal can swap with the last element
+        self.positions: Dict[str, int] = {}
+
+        # Presorted (sort key, name) lists used to walk ordered searches without sorting
+        self.sort_indexes: Dict[str, List[Tuple[object, str]]] = {
+            self.parse_order(field)[0]: [] for field in indexed_fields
+        }
+
+        # KD-trees over physical attributes for nearest neighbour searches
+        self.similarity = SimilarityIndex()
+
         self.rebuild_index()
 
     # Rebuild the index to quickly find animals by name
     def rebuild_index(self):
         self.name_index.clear()
-        for d in self.dogs:
+        self.positions.clear()
+        for i, d in enumerate(self.dogs):
             self.name_index[d.name.lower()] = d
-        for m in self.monkeys:
+            self.positions[d.name.lower()] = i
+        for i, m in enumerate(self.monkeys):
             self.name_index[m.name.lower()] = m
+            self.positions[m.name.lower()] = i
+
+        for field in self.sort_indexes:
+            self.build_sort_index(field)
+
+        self.similarity.build(self.dogs + self.monkeys)
+
+    # Build (or rebuild) a presorted index so searches ordered by this field can stop after the limit
+    def build_sort_index(self, field: str):
+        field, _ = self.parse_order(field)
+        entries = [self.sort_entry(field, a) for a in self.indexable(field, self.dogs + self.monkeys)]
+        entries.sort()
+        self.sort_indexes[field] = entries
+
+    # Return the sort index entry for an animal, the name breaks ties since names are unique
+    @staticmethod
+    def sort_entry(field: str, animal: RescueAnimal):
+        return ORDER_KEYS[field](animal), animal.name.lower()
+
+    # Only monkeys can be ordered by their measurements
+    @staticmethod
+    def indexable(field: str, animals: Iterable[RescueAnimal]):
+        if field in MONKEY_ONLY_KEYS:
+            return [a for a in animals if isinstance(a, Monkey)]
+        return list(animals)
+
+    # Split an order_by value into the field and direction, a leading "-" means descending
+    @staticmethod
+    def parse_order(order_by: str):
+        order_by = order_by.strip().lower()
+        descending = order_by.startswith("-")
+        field = order_by.lstrip("-").strip()
+        if field not in ORDER_KEYS:
+            raise ValueError("Order by must be one of: " + ", ".join(ORDER_KEYS))
+        return field, descending
+
+    # Add an animal to every presorted index. Finding the slot is O(log n), but inserting into a Python list
+    # shifts the entries after it, so each change costs O(n) per presorted index. That shift is a single
+    # memmove and stays cheap at registry sizes, while the name index, positions and KD-trees stay O(1) or
+    # O(log n). Only request presorted indexes for fields that are ordered often.
+    def index_sorted(self, animal: RescueAnimal):
+        for field, entries in self.sort_indexes.items():
+            if self.indexable(field, [animal]):
+                insort(entries, self.sort_entry(field, animal))
+
+    # Remove an animal from every presorted index, O(log n) to find and O(n) to shift like index_sorted
+    def unindex_sorted(self, animal: RescueAnimal):
+        for field, entries in self.sort_indexes.items():
+            if not self.indexable(field, [animal]):
+                continue
+            entry = self.sort_entry(field, animal)
+            i = bisect_left(entries, entry)
+            if i < len(entries) and entries[i] == entry:
+                del entries[i]
 
     # Check if a name exists
     def name_exists(self, name: str):
@@ -39,60 +143,203 @@ class Algorithms:
 
     # If animal type is accepted and name is not already in system, add animal
     def add_animal(self, animal: RescueAnimal):
-        key = animal.name.lower()
-        if key in self.name_index:
-            raise ValueError("This animal is already in our system")
-
-        if isinstance(animal, Dog):
-            self.dogs.append(animal)
-        elif isinstance(animal, Monkey):
-            self.monkeys.append(animal)
-        else:
-            raise ValueError("We do not currently except this animal type.")
+        with self.lock:
+            key = animal.name.lower()
+            if key in self.name_index:
+                raise ValueError("This animal is already in our system")
+
+            if isinstance(animal, Dog):
+                kind = "dog"
+            elif isinstance(animal, Monkey):
+                kind = "monkey"
+            else:
+                raise ValueError("We do not currently except this animal type.")
+
+            ticket = self.log_change({"op": "add", "kind": kind, "record": animal.to_record()})
+
+            animals = self.animal_list(animal)
+            animals.append(animal)
+            self.positions[key] = len(animals) - 1
+            self.name_index[key] = animal
+            self.index_sorted(animal)
+            self.similarity.add(animal)
+
+        self.wait_durable(ticket)
+
+    # Return the list that stores this kind of animal
+    def animal_list(self, animal: RescueAnimal):
+        return self.dogs if isinstance(animal, Dog) else self.monkeys
+
+    # Remove an animal by name. The last animal in the list is moved into the freed slot so removal is O(1).
+    def remove_animal(self, name: str):
+        with self.lock:
+            key = name.strip().lower()
+            animal = self.name_index.get(key)
+            if not animal:
+                raise ValueError(f"{name} not found.")
+
+            ticket = self.log_change({"op": "remove", "name": animal.name})
+
+            animals = self.animal_list(animal)
+            i = self.positions.pop(key)
+            last = animals.pop()
+            if last is not animal:
+                animals[i] = last
+                self.positions[last.name.lower()] = i
+
+            del self.name_index[key]
+            self.unindex_sorted(animal)
+            self.similarity.remove(animal)
+
+        self.wait_durable(ticket)
+        return animal
+
+    # Rename an animal, only the index entries for this animal are moved
+    def rename_animal(self, name: str, new_name: str):
+        return self.update_animal(name, name=new_name)
+
+    # Correct one or more fields of an animal. The changes are validated by building a new record first, so a
+    # bad value leaves the animal untouched, then the animal is updated in place and re-indexed.
+    def update_animal(self, name: str, /, **changes):
+        with self.lock:
+            key = name.strip().lower()
+            animal = self.name_index.get(key)
+            if not animal:
+                raise ValueError(f"{name} not found.")
+
+            record = animal.to_record()
+            unknown = [field for field in changes if field not in record]
+            if unknown:
+                raise ValueError("Cannot update: " + ", ".join(unknown))
 
-        self.name_index[key] = animal
+            record.update(changes)
+            updated = type(animal)(**record)
+
+            new_key = updated.name.lower()
+            if new_key != key and new_key in self.name_index:
+                raise ValueError("This animal is already in our system")
+
+            # Journal the validated values so replay does not depend on how the caller wrote them
+            validated = updated.to_record()
+            ticket = self.log_change(
+                {"op": "update", "name": animal.name, "changes": {field: validated[field] for field in changes}}
+            )
+
+            self.unindex_sorted(animal)
+            self.similarity.remove(animal)
+            vars(animal).update(vars(updated))
+            if new_key != key:
+                del self.name_index[key]
+                self.name_index[new_key] = animal
+                self.positions[new_key] = self.positions.pop(key)
+            self.index_sorted(animal)
+            self.similarity.add(animal)
+
+        self.wait_durable(ticket)
+        return animal
 
     # Reserve animal by name, display error message if animal is not found, already reserved, or not eligible
     def reserve_by_name(self, name: str):
-        animal = self.get_by_name(name)
-        if not animal:
-            return f"{name} not found. Please try again."
+        with self.lock:
+            animal = self.get_by_name(name)
+            if not animal:
+                return f"{name} not found. Please try again."
 
-        if animal.reserved:
-            return f"{animal.name} is already reserved."
+            if animal.reserved:
+                return f"{animal.name} is already reserved."
 
-        if not animal.is_reservable():
-            return f"{animal.name} is not eligible for reservation until it is in service."
+            if not animal.is_reservable():
+                return f"{animal.name} is not eligible for reservation until it is in service."
 
-        animal.reserved = True
+            ticket = self.log_change({"op": "reserve", "name": animal.name})
+            animal.reserved = True
+
+        self.wait_durable(ticket)
         return f"{animal.name} has been reserved."
 
     # Advance training using animals name
     def advance_training(self, name: str):
-        animal = self.get_by_name(name)
-        if not animal:
-            return f"{name} not found. Please try again."
+        with self.lock:
+            animal = self.get_by_name(name)
+            if not animal:
+                return f"{name} not found. Please try again."
 
-        if animal.training_status == "in service":
-            return f"{animal.name} is already 'in service' and cannot advance further."
+            if animal.training_status == "in service":
+                return f"{animal.name} is already 'in service' and cannot advance further."
 
-        before = animal.training_status
-        try:
+            before = animal.training_status
+            ticket = self.log_change({"op": "advance", "name": animal.name})
             animal.advance_training()
-        except ValueError as e:
-            return f"Cannot advance training: {e}"
+            after = animal.training_status
 
-        after = animal.training_status
+        self.wait_durable(ticket)
         return f"{animal.name} advanced from {before} to {after}."
 
-    # Allows user to search using multiple filters at once
+    # Queue a change in the journal, if there is one, and return its sequence number. Every change is
+    # checked first and logged before it is applied, so if the journal is closed or has failed the
+    # exception leaves memory untouched.
+    def log_change(self, change: dict):
+        if self.journal is None:
+            return None
+        return self.journal.append(change)
+
+    # Wait for a journaled change outside the lock, so concurrent changes share one disk sync. If the wait
+    # fails the change is already applied in memory but may not be on disk, so the error is raised to the
+    # caller. The journal then refuses every later append, so no further changes are accepted.
+    def wait_durable(self, ticket: Optional[int]):
+        if ticket is not None and self.journal is not None:
+            self.journal.wait(ticket)
+
+    # Apply journaled changes in order to rebuild the state from a previous run. The changes are not
+    # journaled again while they are replayed.
+    def replay(self, changes: Iterable[dict]):
+        journal, self.journal = self.journal, None
+        try:
+            for change in changes:
+                self.apply_change(change)
+        finally:
+            self.journal = journal
+
+    # Apply one journaled change
+    def apply_change(self, change: dict):
+        op = change["op"]
+        if op == "add":
+            animal_type = Dog if change["kind"] == "dog" else Monkey
+            self.add_animal(animal_type.from_record(change["record"]))
+        elif op == "remove":
+            self.remove_animal(change["name"])
+        elif op == "update":
+            self.update_animal(change["name"], **change["changes"])
+        elif op == "reserve":
+            self.reserve_by_name(change["name"])
+        elif op == "advance":
+            self.advance_training(change["name"])
+        else:
+            raise ValueError(f"Unknown journal change: {op}")
+
+    # Allows user to search using multiple filters at once, optionally ordered by a field and limited to the
+    # first results. Ordered searches walk a presorted index when one exists and otherwise use a heap to keep only
+    # the top "limit" matches, so they cost O(n log k) instead of a full sort.
     def search(
             self, species_or_type: Optional[str] = None, training_status: Optional[str] = None,
             reserved: Optional[bool] = None, acquisition_country: Optional[str] = None,
-            in_service_country: Optional[str] = None ) -> List[RescueAnimal]:
-        results: List[RescueAnimal] = []
-        all_animals: List[RescueAnimal] = self.dogs + self.monkeys
+            in_service_country: Optional[str] = None, order_by: Optional[str] = None,
+            limit: Optional[int] = None) -> List[RescueAnimal]:
+        if limit is not None and (not isinstance(limit, int) or limit < 0):
+            raise ValueError("Limit must be a whole number that is 0 or greater.")
 
+        matches = self.search_filter(
+            species_or_type, training_status, reserved, acquisition_country, in_service_country
+        )
+
+        with self.lock:
+            return self.ordered_matches(matches, order_by, limit)
+
+    # Normalize the search filters once and return a function that checks an animal against them
+    def search_filter(
+            self, species_or_type: Optional[str] = None, training_status: Optional[str] = None,
+            reserved: Optional[bool] = None, acquisition_country: Optional[str] = None,
+            in_service_country: Optional[str] = None) -> Callable[[RescueAnimal], bool]:
         sp = species_or_type.strip().lower() if isinstance(species_or_type, str) and species_or_type.strip() else None
         ts = training_status.strip() if isinstance(training_status, str) and training_status.strip() else None
         ac = acquisition_country.strip().lower() if isinstance(acquisition_country,
@@ -100,24 +347,104 @@ class Algorithms:
         isc = in_service_country.strip().lower() if isinstance(in_service_country,
                                                                str) and in_service_country.strip() else None
 
-        for a in all_animals:
-            if reserved is not None and a.reserved != reserved:
-                continue
-            if ts is not None and a.training_status != ts:
-                continue
-            if ac is not None and a.acquisition_country.lower() != ac:
-                continue
-            if isc is not None and a.in_service_country.lower() != isc:
-                continue
+        def matches(a: RescueAnimal):
+            return self.matches(a, sp, ts, reserved, ac, isc)
+
+        return matches
+
+    # Return the animals that pass the filter, in order and limited when requested
+    def ordered_matches(
+            self, matches: Callable[[RescueAnimal], bool], order_by: Optional[str],
+            limit: Optional[int]) -> List[RescueAnimal]:
+        # Unordered search keeps list order and stops as soon as the limit is reached
+        if order_by is None:
+            results = filter(matches, self.dogs + self.monkeys)
+            return list(islice(results, limit))
+
+        field, descending = self.parse_order(order_by)
+
+        # Walk the presorted index in order and stop after the limit
+        entries = self.sort_indexes.get(field)
+        if entries is not None:
+            ordered = reversed(entries) if descending else entries
+            results = filter(matches, (self.name_index[key] for _, key in ordered))
+            return list(islice(results, limit))
+
+        candidates = filter(matches, self.indexable(field, self.dogs + self.monkeys))
+
+        def sort_key(a: RescueAnimal):
+            return self.sort_entry(field, a)
+
+        if limit is None:
+            return sorted(candidates, key=sort_key, reverse=descending)
+        if descending:
+            return heapq.nlargest(limit, candidates, key=sort_key)
+        return heapq.nsmallest(limit, candidates, key=sort_key)
+
+    # Find the k animals of the same kind whose physical attributes are closest to the named animal. Dogs are
+    # compared on age and weight, monkeys on tail length, height, body length and weight. Takes the same
+    # filters as search, which are applied while walking the KD-tree.
+    def find_similar(self, name: str, k: int = 5, **filters) -> List[RescueAnimal]:
+        with self.lock:
+            animal = self.get_by_name(name)
+            if not animal:
+                raise ValueError(f"{name} not found.")
+
+            key = animal.name.lower()
+            matches = self.keyword_filter(filters)
+            found = self.similarity.nearest(
+                animal_kind(animal), SimilarityIndex.features(animal), k,
+                lambda other: other != key and matches(self.name_index[other])
+            )
+            return [self.name_index[other] for _, other in found]
+
+    # Find the k animals of a kind ("dog" or "monkey") closest to the given attributes. Takes the same
+    # filters as find_similar, for example
+    # find_nearest("monkey", {"tail_length": 12.5, "height": 20.4, "body_length": 27.6, "weight": 25.6}, reserved=False)
+    def find_nearest(self, kind: str, features: Dict[str, float], k: int = 5, **filters) -> List[RescueAnimal]:
+        kind = kind.strip().lower()
+        if kind not in FEATURES:
+            raise ValueError("Kind must be one of: " + ", ".join(FEATURES))
+        missing = [f for f in FEATURES[kind] if f not in features]
+        if missing or len(features) != len(FEATURES[kind]):
+            raise ValueError(f"A {kind} is compared on: " + ", ".join(FEATURES[kind]))
+
+        with self.lock:
+            matches = self.keyword_filter(filters)
+            found = self.similarity.nearest(
+                kind, [float(features[f]) for f in FEATURES[kind]], k,
+                lambda other: matches(self.name_index[other])
+            )
+            return [self.name_index[other] for _, other in found]
+
+    # Build a search filter from keyword filters, rejecting any name that search_filter does not take
+    def keyword_filter(self, filters: dict):
+        allowed = inspect.signature(self.search_filter).parameters
+        unknown = [name for name in filters if name not in allowed]
+        if unknown:
+            raise ValueError("Cannot filter on: " + ", ".join(unknown))
+        return self.search_filter(**filters)
 
-            if sp is not None:
-                if isinstance(a, Dog):
-                    if sp != "dog" and sp != a.breed.lower():
-                        continue
-                if isinstance(a, Monkey):
-                    if sp != "monkey" and sp != a.species.lower():
-                        continue
+    # Check one animal against the normalized search filters
+    @staticmethod
+    def matches(
+            a: RescueAnimal, sp: Optional[str], ts: Optional[str], reserved: Optional[bool],
+            ac: Optional[str], isc: Optional[str]):
+        if reserved is not None and a.reserved != reserved:
+            return False
+        if ts is not None and a.training_status != ts:
+            return False
+        if ac is not None and a.acquisition_country.lower() != ac:
+            return False
+        if isc is not None and a.in_service_country.lower() != isc:
+            return False
 
-            results.append(a)
+        if sp is not None:
+            if isinstance(a, Dog):
+                if sp != "dog" and sp != a.breed.lower():
+                    return False
+            if isinstance(a, Monkey):
+                if sp != "monkey" and sp != a.species.lower():
+                    return False
 
-        return results
+        return True
@@ -0,0 +1,73 @@
+# Geraldine Whitaker
+# This file measures how many animals per second each construction path can build:
+# - the full constructors, which validate every field
+# - Validation.build_batch, which validates untrusted rows in a batch and then uses from_record
+# - from_record alone, for records that were already validated
+#
+# Usage: python Benchmark.py [rows]
+
+import gc
+import sys
+import time
+from typing import Callable, List
+
+import Validation
+from Dog import Dog
+from Monkey import Monkey
+
+
+# Build sample rows that pass validation
+def sample_rows(kind: str, count: int):
+    rows = []
+    for i in range(count):
+        row = {
+            "name": f" Animal{i} ", "gender": "Female", "age": 1 + i % 15, "weight": 10 + i % 40,
+            "acquisition_date": f"{1 + i % 12:02d}-{1 + i % 28:02d}-{2000 + i % 25}",
+            "acquisition_country": "United States", "training_status": "Phase II", "reserved": False,
+            "in_service_country": "Canada",
+        }
+        if kind == "dog":
+            row["breed"] = "Beagle"
+        else:
+            row.update(species="squirrel monkey", tail_length=12.5, height=20.4, body_length=27.6)
+        rows.append(row)
+    return rows
+
+
+# Return the objects built per second by a function that builds all rows
+def rate(build: Callable[[], List], count: int, repeat: int = 5):
+    best = min(timed(build) for _ in range(repeat))
+    return count / best
+
+
+# Garbage collection is paused while timing, as timeit does, so a collection that happens to land in one
+# path does not decide the comparison
+def timed(build: Callable[[], List]):
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        build()
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def main(count: int = 100000):
+    print(f"\nObjects built per second ({count} rows)")
+    print("Kind | Constructor | Validated batch | Trusted from_record")
+    print("-" * 60)
+
+    for kind, animal_type in (("dog", Dog), ("monkey", Monkey)):
+        rows = sample_rows(kind, count)
+        records = Validation.validate_batch(kind, rows)[0]
+
+        constructor = rate(lambda: [animal_type(**row) for row in rows], count)
+        batch = rate(lambda: Validation.build_batch(kind, rows), count)
+        trusted = rate(lambda: [animal_type.from_record(record) for record in records], count)
+        print(f"{kind} | {constructor:,.0f} | {batch:,.0f} | {trusted:,.0f}")
+    print("")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
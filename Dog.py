@@ -33,7 +33,34 @@ class Dog(RescueAnimal):
             in_service_country=in_service_country
         )
 
-        # Validate breed is not empty
-        self.breed = self.breed.strip()
-        if not self.breed:
+        self.breed = self.check_breed(self.breed)
+
+    # Validate breed is not empty and return it stripped
+    @staticmethod
+    def check_breed(breed):
+        breed = breed.strip() if isinstance(breed, str) else ""
+        if not breed:
             raise ValueError("Breed cannot be empty.")
+        return breed
+
+    # Validate every field of a dog record, the same checks the constructor runs
+    @classmethod
+    def check_record(cls, row: dict):
+        record = cls.check_shared(row)
+        record["breed"] = cls.check_breed(row["breed"])
+        return record
+
+    # Return the constructor arguments for this dog
+    def to_record(self):
+        return {
+            "name": self.name,
+            "breed": self.breed,
+            "gender": self.gender,
+            "age": self.age,
+            "weight": self.weight,
+            "acquisition_date": self.acquisition_date,
+            "acquisition_country": self.acquisition_country,
+            "training_status": self.training_status,
+            "reserved": self.reserved,
+            "in_service_country": self.in_service_country
+        }
@@ -2,14 +2,19 @@
 # This file is the main controller of the Grazioso Rescue Animal System. It manages user authentication,
 # displays role-based menus, processes user input, and allows user to intake or reserve animals.
 
-from typing import List
+import argparse
+from typing import List, Optional
 from Dog import Dog
 from Monkey import Monkey
 from Security import AuthSystem
 from Algorithms import Algorithms
+from Journal import Journal, read_records
 
 ALLOWED_SPECIES = Monkey.ALLOWED_SPECIES
 
+# Changes made since the lists below were written are journaled here and replayed on startup
+JOURNAL_PATH = "rescue_journal.wal"
+
 # Current list of dogs
 dog_list = [
     Dog("Spot", "German Shepherd", "male", 1, 25.6, "05-12-2019", "United States", "intake", False, "United States"),
@@ -25,7 +30,7 @@ monkey_list = [
 ]
 
 # Implements multi criteria search and reservation and training status updates
-alg = Algorithms(dog_list, monkey_list)
+alg = Algorithms(dog_list, monkey_list, indexed_fields=("name", "acquisition_date"))
 
 
 # Check that animal name is in either list
@@ -197,7 +202,7 @@ def intake_new_dog():
         )
         alg.add_animal(dog)
         print(f"\n{dog.name} has been added.\n")
-    except ValueError as e:
+    except (ValueError, OSError) as e:
         print(f"\nError: {e}\n")
 
 
@@ -235,7 +240,7 @@ def intake_new_monkey():
         )
         alg.add_animal(monkey)
         print(f"\n{monkey.name} has been added.\n")
-    except ValueError as e:
+    except (ValueError, OSError) as e:
         print(f"\nError: {e}\n")
 
 
@@ -261,14 +266,12 @@ def advance_training():
         if not cleared:
             print("\nCannot advance. Animal must be vet-cleared to begin training.\n")
             return
-        
+
+        print(f"\n{animal.name} is now vet-cleared.")
         try:
-            before = animal.training_status
-            animal.advance_training()
-            after = animal.training_status
-            print(f"\n{animal.name} is now vet-cleared and advanced from {before} to {after}.\n")
-        except ValueError as e:
-            print(f"\nError: {e}\n")
+            print(alg.advance_training(animal.name) + "\n")
+        except (ValueError, OSError) as e:
+            print(f"Error: {e}\n")
         return
 
     # Display status update 
@@ -280,19 +283,49 @@ def advance_training():
         return
 
     try:
-        before = animal.training_status
-        animal.advance_training()
-        after = animal.training_status
-        print(f"\n{animal.name} advanced from {before} to {after}.\n")
-    except ValueError as e:
+        print("\n" + alg.advance_training(animal.name) + "\n")
+    except (ValueError, OSError) as e:
+        print(f"\nError: {e}\n")
+
+
+# Prompt admin for an animal to retire and remove it from the system
+def remove_animal():
+    print("\n--- Remove an Animal ---")
+    name = prompt_text("Which animal would you like to remove?: ")
+
+    if not prompt_yes_no(f"Remove {name} from the system?"):
+        print("\nNo changes made.\n")
+        return
+
+    try:
+        animal = alg.remove_animal(name)
+        print(f"\n{animal.name} has been removed.\n")
+    except (ValueError, OSError) as e:
+        print(f"\nError: {e}\n")
+
+
+# Prompt admin for an animal and its new name
+def rename_animal():
+    print("\n--- Rename an Animal ---")
+    name = prompt_text("Which animal would you like to rename?: ")
+    new_name = prompt_text("What is the animal's new name? ")
+
+    try:
+        before = alg.get_by_name(name).name if alg.name_exists(name) else name
+        animal = alg.rename_animal(name, new_name)
+        print(f"\n{before} has been renamed to {animal.name}.\n")
+    except (ValueError, OSError) as e:
         print(f"\nError: {e}\n")
 
 
 # Print header and prompt user for animal to reserve then use algorithm to reserve by name
-def reserve_animal_customer():
+def customer_reserve():
     print("\n--- Reserve an Animal ---")
     name = prompt_text("Enter the animal name you want to reserve: ")
-    print("\n" + alg.reserve_by_name(name) + "\n")
+    try:
+        print("\n" + alg.reserve_by_name(name) + "\n")
+    except (ValueError, OSError) as e:
+        print(f"\nError: {e}\n")
 
 
 # User can search based on type, breed/species, training status, reserved status, and location 
@@ -306,6 +339,16 @@ def search():
     reserved_raw = input("Reserved? (yes/no/blank): ").strip().lower()
     acquisition_country = input("Acquisition country: ").strip()
     in_service_country = input("In service country: ").strip()
+    order_by = input("Order by (age/weight/acquisition_date/name/tail_length/height/body_length, "
+                     "start with - for descending): ").strip()
+    limit_raw = input("Max results: ").strip()
+
+    limit = None
+    if limit_raw:
+        if not limit_raw.isdigit():
+            print("\nError: Max results must be a whole number.\n")
+            return
+        limit = int(limit_raw)
 
     reserved = None
     if reserved_raw in ("yes", "y"):
@@ -313,13 +356,19 @@ def search():
     elif reserved_raw in ("no", "n"):
         reserved = False
 
-    results = alg.search(
-        species_or_type=species_or_type if species_or_type else None,
-        training_status=training_status if training_status else None,
-        reserved=reserved,
-        acquisition_country=acquisition_country if acquisition_country else None,
-        in_service_country=in_service_country if in_service_country else None,
-    )
+    try:
+        results = alg.search(
+            species_or_type=species_or_type if species_or_type else None,
+            training_status=training_status if training_status else None,
+            reserved=reserved,
+            acquisition_country=acquisition_country if acquisition_country else None,
+            in_service_country=in_service_country if in_service_country else None,
+            order_by=order_by if order_by else None,
+            limit=limit,
+        )
+    except ValueError as e:
+        print(f"\nError: {e}\n")
+        return
 
     print_table(results)
 
@@ -336,6 +385,8 @@ def admin_menu():
         print("[5] View all monkeys")
         print("[6] View all unreserved animals")
         print("[7] Multi-criteria search")
+        print("[8] Remove an animal")
+        print("[9] Rename an animal")
         print("[q] Logout\n")
 
         choice = input("Enter a menu selection: ").strip()
@@ -354,6 +405,10 @@ def admin_menu():
             search_unreserved()
         elif choice == "7":
             search()
+        elif choice == "8":
+            remove_animal()
+        elif choice == "9":
+            rename_animal()
         elif choice.lower() == "q":
             print("\nLogging out...\n")
         else:
@@ -385,19 +440,41 @@ def customer_menu():
 
 
 # Run security check before authorizing and displaying menu 
-def main():
+def main(record_path: Optional[str] = None):
+    global alg
+
+    # Restore intakes, reservations and training updates from earlier runs, then journal new changes
+    journal = Journal(JOURNAL_PATH)
+    alg.replay(read_records(JOURNAL_PATH))
+    alg.journal = journal
+
+    # Optionally record this session as an operation trace that LoadTest.py can replay
+    recorder = None
     auth = AuthSystem()
-    user = auth.login_prompt()
-    if not user:
-        return
+    if record_path:
+        from LoadTest import RecordingAlgorithms, RecordingAuthSystem, TraceRecorder
+        recorder = TraceRecorder(record_path)
+        alg = RecordingAlgorithms(alg, recorder)
+        auth = RecordingAuthSystem(auth, recorder)
 
-    if user.role == "admin":
-        admin_menu()
-    else:
-        customer_menu()
+    try:
+        user = auth.login_prompt()
+        if not user:
+            return
+
+        if user.role == "admin":
+            admin_menu()
+        else:
+            customer_menu()
 
-    print("Thanks for using Grazioso Salvare.")
+        print("Thanks for using Grazioso Salvare.")
+    finally:
+        journal.close()
+        if recorder:
+            recorder.close()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Grazioso Salvare Rescue Animal System")
+    parser.add_argument("--record", metavar="TRACE", help="record this session as an operation trace")
+    main(parser.parse_args().record)
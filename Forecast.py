@@ -0,0 +1,282 @@
+# Geraldine Whitaker
+# This file forecasts how many animals of each species will be in service in each country. The training
+# pipeline (intake -> Phase I -> ... -> Phase IV -> in service) is modeled with a weekly chance of advancing
+# out of each phase and a weekly number of new intakes. Thousands of simulated futures are drawn together as
+# NumPy arrays, one row per simulation, so the cost does not depend on how many animals there are.
+#
+# Usage: python Forecast.py [--weeks 13] [--trials 10000] [--animals 5000]
+# Requires NumPy, which is listed in requirements.txt (pip install -r requirements.txt).
+
+import argparse
+import calendar
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from Algorithms import Algorithms, acquisition_date_key
+from Dog import Dog
+from Monkey import Monkey
+from RescueAnimal import RescueAnimal
+
+
+# Every status in pipeline order, and the phases an animal can advance out of
+PIPELINE: List[str] = RescueAnimal.ALLOWED_STATUSES
+PHASES: List[str] = [s for s in PIPELINE if RescueAnimal.UPDATE_STATUS[s] != s]
+
+# Weekly chance of advancing when a phase has no animals to estimate from, about 8 weeks per phase
+DEFAULT_ADVANCE_RATE = 1 / 8
+
+
+# Forecast for one species in one in-service country
+@dataclass
+class GroupForecast:
+    species: str
+    country: str
+    in_service_now: int
+    mean: float
+    low: float
+    median: float
+    high: float
+    intake_source: str = "recent"
+
+
+# Dogs are forecast together, monkeys by species
+def species_of(animal: RescueAnimal):
+    return "dog" if isinstance(animal, Dog) else animal.species.title()
+
+
+# Group key of an animal. Countries are compared case-insensitively, as the search filters do.
+def group_of(animal: RescueAnimal):
+    return species_of(animal), animal.in_service_country.lower()
+
+
+# Count animals in each status for every (species, in-service country) group
+def status_counts(alg: Algorithms):
+    counts: Dict[Tuple[str, str], np.ndarray] = {}
+    for animal in alg.dogs + alg.monkeys:
+        group = group_of(animal)
+        if group not in counts:
+            counts[group] = np.zeros(len(PIPELINE), dtype=np.int64)
+        counts[group][PIPELINE.index(animal.training_status)] += 1
+    return counts
+
+
+# Return the calendar date of an acquisition date key. Validation allows days up to 31 in every month, so
+# a day past the end of its month, such as 02-30, is moved back to the month's last day.
+def calendar_date(key: Tuple[int, int, int]):
+    year, month, day = key
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+# Estimate weekly intakes per group from animals acquired in the last "window_weeks" weeks. A group with
+# no intakes in that window falls back to its average over the whole history, from the earliest
+# acquisition in the registry until today. Returns the rates and the set of groups that fell back.
+def estimate_intake_rates(alg: Algorithms, window_weeks: int = 52, today: Optional[date] = None):
+    today = today or date.today()
+    start = today - timedelta(weeks=window_weeks)
+    cutoff = (start.year, start.month, start.day)
+
+    recent: Dict[Tuple[str, str], int] = {}
+    total: Dict[Tuple[str, str], int] = {}
+    earliest = (today.year, today.month, today.day)
+    for animal in alg.dogs + alg.monkeys:
+        group = group_of(animal)
+        acquired = acquisition_date_key(animal)
+        earliest = min(earliest, acquired)
+        total[group] = total.get(group, 0) + 1
+        recent[group] = recent.get(group, 0) + (acquired >= cutoff)
+
+    history_weeks = max((today - calendar_date(earliest)).days / 7, 1.0)
+    rates: Dict[Tuple[str, str], float] = {}
+    from_history = set()
+    for group, count in total.items():
+        if recent[group]:
+            rates[group] = recent[group] / window_weeks
+        else:
+            rates[group] = count / history_weeks
+            from_history.add(group)
+    return rates, from_history
+
+
+# Estimate the weekly chance of advancing out of each phase for each species. The registry only has the
+# current statuses, so this assumes the pipeline is in balance: as many animals leave a phase each week as
+# arrive at intake, which makes the chance of leaving a phase the intake rate divided by its head count.
+def estimate_advance_rates(alg: Algorithms, intake_rates: Dict[Tuple[str, str], float]):
+    counts = status_counts(alg)
+    rates: Dict[str, np.ndarray] = {}
+
+    for species in {group[0] for group in counts}:
+        in_phase = sum(c for group, c in counts.items() if group[0] == species)[:len(PHASES)]
+        arrivals = sum(r for group, r in intake_rates.items() if group[0] == species)
+        species_rates = np.full(len(PHASES), DEFAULT_ADVANCE_RATE)
+        if arrivals > 0:
+            known = in_phase > 0
+            species_rates[known] = np.clip(arrivals / in_phase[known], 0.01, 1.0)
+        rates[species] = species_rates
+    return rates
+
+
+# Weekly transition matrix of the pipeline for each group, shaped (groups, statuses, statuses)
+def transition_matrices(advance: np.ndarray):
+    groups, phases = advance.shape
+    matrices = np.zeros((groups, phases + 1, phases + 1))
+    steps = np.arange(phases)
+    matrices[:, steps, steps] = 1 - advance
+    matrices[:, steps, steps + 1] = advance
+    matrices[:, phases, phases] = 1.0
+    return matrices
+
+
+# Chance that an animal reaches service within "weeks" weeks, from each phase it is in now and from an
+# intake arriving in one of the coming weeks. Returns (groups, phases) and (groups,) arrays.
+def service_probabilities(advance: np.ndarray, weeks: int):
+    matrices = transition_matrices(advance)
+    phases = advance.shape[1]
+
+    # after[w] is the chance of being in service w weeks after being in each status
+    step = np.broadcast_to(np.eye(phases + 1), matrices.shape).copy()
+    after = []
+    for _ in range(weeks + 1):
+        after.append(step[:, :, phases])
+        step = step @ matrices
+
+    from_phase = after[weeks][:, :phases]
+
+    # An intake arriving at the end of week t has weeks - t weeks left to advance
+    from_intake = sum(after[weeks - t][:, 0] for t in range(1, weeks + 1))
+    return from_phase, from_intake
+
+
+# Run "trials" simulated futures of "weeks" weeks for every group at once and return the in-service count
+# of each group at the end of each trial, shaped (trials, groups). Each week an animal advances one phase
+# with its phase's chance, new intakes arrive at the end of the week, and animals in service stay in service.
+# Animals move independently, so instead of stepping week by week each trial draws its end state directly:
+# the animals now in each phase that reach service are binomial, and the intakes that reach service are
+# Poisson because thinning a Poisson stream keeps it Poisson. This gives the same distribution with one
+# draw per phase instead of one per phase per week.
+def simulate(counts: np.ndarray, advance: np.ndarray, intake: np.ndarray, weeks: int, trials: int,
+             seed: Optional[int] = None):
+    rng = np.random.default_rng(seed)
+    phases = advance.shape[1]
+    from_phase, from_intake = service_probabilities(advance, weeks)
+
+    in_service = np.repeat(counts[np.newaxis, :, phases], trials, axis=0)
+    for g, p in zip(*np.nonzero(counts[:, :phases])):
+        in_service[:, g] += rng.binomial(counts[g, p], from_phase[g, p], size=trials)
+    in_service += rng.poisson(intake * from_intake, size=(trials, len(intake)))
+    return in_service
+
+
+# Return supplied intake rates keyed like group_of(), raising ValueError on an unknown species or a
+# negative rate
+def normalize_intake_rates(intake_rates: Dict[Tuple[str, str], float]):
+    species_names = {s.lower(): s.title() for s in Monkey.ALLOWED_SPECIES}
+    species_names["dog"] = "dog"
+
+    normalized: Dict[Tuple[str, str], float] = {}
+    countries: Dict[str, str] = {}
+    for (species, country), rate in intake_rates.items():
+        key = species.strip().lower()
+        if key not in species_names:
+            raise ValueError("Species must be dog or one of: " + ", ".join(Monkey.ALLOWED_SPECIES))
+        if not country.strip():
+            raise ValueError("In service country cannot be empty.")
+        if rate < 0:
+            raise ValueError("Intake rates cannot be negative.")
+        country = country.strip()
+        normalized[(species_names[key], country.lower())] = float(rate)
+        countries.setdefault(country.lower(), country)
+    return normalized, countries
+
+
+# Forecast the in-service count of every (species, country) group after "weeks" weeks, 13 weeks being the
+# next quarter. Advance rates (per species, one weekly chance per phase) and intake rates (per group,
+# animals per week) are estimated from the registry, and supplied rates replace the estimates for the
+# species or groups they name. A supplied group with no animals yet is forecast from its intakes alone.
+# Each forecast's intake_source is "recent", "history" when its group had no intakes in the last year, or
+# "given". The band is the range between the low and high percentiles of the simulated counts.
+def forecast_in_service(
+        alg: Algorithms, weeks: int = 13, trials: int = 10000,
+        advance_rates: Optional[Dict[str, Sequence[float]]] = None,
+        intake_rates: Optional[Dict[Tuple[str, str], float]] = None,
+        band: Tuple[float, float] = (5, 95), seed: Optional[int] = None) -> List[GroupForecast]:
+    given, supplied_countries = normalize_intake_rates(intake_rates or {})
+
+    with alg.lock:
+        counts_by_group = status_counts(alg)
+        estimated_intake, from_history = estimate_intake_rates(alg)
+        sources = {group: "history" if group in from_history else "recent" for group in estimated_intake}
+        sources.update((group, "given") for group in given)
+        intake_rates = {**estimated_intake, **given}
+        estimated = estimate_advance_rates(alg, intake_rates)
+
+        # Show each country the way it was first spelled in the registry, or as supplied if it is new
+        country_names = dict(supplied_countries)
+        registry_countries: Dict[str, str] = {}
+        for animal in alg.dogs + alg.monkeys:
+            registry_countries.setdefault(animal.in_service_country.lower(), animal.in_service_country)
+        country_names.update(registry_countries)
+
+    for group in given:
+        if group not in counts_by_group:
+            counts_by_group[group] = np.zeros(len(PIPELINE), dtype=np.int64)
+
+    groups = sorted(counts_by_group)
+    if not groups:
+        return []
+
+    rates = dict(estimated)
+    for species, phase_rates in (advance_rates or {}).items():
+        phase_rates = np.asarray(phase_rates, dtype=float)
+        if phase_rates.shape != (len(PHASES),) or np.any((phase_rates < 0) | (phase_rates > 1)):
+            raise ValueError(f"Advance rates need one chance between 0 and 1 for each of: {', '.join(PHASES)}")
+        rates[species] = phase_rates
+
+    counts = np.stack([counts_by_group[g] for g in groups])
+    advance = np.stack([rates.get(g[0], np.full(len(PHASES), DEFAULT_ADVANCE_RATE)) for g in groups])
+    intake = np.array([intake_rates.get(g, 0.0) for g in groups])
+
+    in_service = simulate(counts, advance, intake, weeks, trials, seed)
+    low, median, high = np.percentile(in_service, [band[0], 50, band[1]], axis=0)
+    mean = in_service.mean(axis=0)
+
+    return [
+        GroupForecast(species, country_names[country], int(counts[i, -1]), float(mean[i]), float(low[i]),
+                      float(median[i]), float(high[i]), sources[(species, country)])
+        for i, (species, country) in enumerate(groups)
+    ]
+
+
+# Print forecasts as a table, with the band they were forecast with as the low and high columns
+def print_forecast(forecasts: List[GroupForecast], weeks: int, band: Tuple[float, float] = (5, 95)):
+    print(f"\nIn service in {weeks} weeks")
+    print(f"Species | Country | Now | Mean | {band[0]:g}% | Median | {band[1]:g}% | Intake rate from")
+    print("-" * 80)
+    for f in forecasts:
+        print(f"{f.species} | {f.country} | {f.in_service_now} | {f.mean:.1f} | {f.low:.0f} | {f.median:.0f} | "
+              f"{f.high:.0f} | {f.intake_source}")
+    if any(f.intake_source == "history" for f in forecasts):
+        print("history: no intakes in the last year, so the average over all acquisitions was used")
+    print("")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast in-service animals per species and country.")
+    parser.add_argument("--weeks", type=int, default=13)
+    parser.add_argument("--trials", type=int, default=10000)
+    parser.add_argument("--animals", type=int, default=0, help="add this many synthetic animals to the sample")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--band", type=float, nargs=2, default=(5, 95), metavar=("LOW", "HIGH"),
+                        help="percentiles of the forecast band")
+    args = parser.parse_args()
+
+    from LoadTest import build_registry
+    alg = build_registry(args.animals)
+    band = tuple(args.band)
+    print_forecast(forecast_in_service(alg, args.weeks, args.trials, band=band, seed=args.seed), args.weeks, band)
+
+
+if __name__ == "__main__":
+    main()
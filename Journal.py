@@ -0,0 +1,168 @@
+# Geraldine Whitaker
+# This file stores an append-only write-ahead journal of changes to the animal registry so intakes,
+# reservations and training updates are not lost when the program exits. Every record is one line
+# made of a CRC32 checksum and the JSON change, and a background writer group commits every record
+# that is waiting so many changes share one fsync.
+
+import json
+import os
+import threading
+import zlib
+from typing import Iterator, List, Optional
+
+
+# How long a change waits before it is acknowledged:
+# - "none": the change is queued and written in the background, a crash can lose the latest changes
+# - "flush": wait until the change is written to the operating system, survives the program crashing
+# - "fsync": wait until the change is fsynced to disk, survives the machine losing power
+DURABILITY_LEVELS = ("none", "flush", "fsync")
+
+
+# Turn a change into a checksummed journal line
+def encode_record(record: dict):
+    payload = json.dumps(record, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return b"%08x " % zlib.crc32(payload) + payload + b"\n"
+
+
+# Turn a journal line back into a change, return None if the line is torn or the checksum does not match
+def decode_record(line: bytes):
+    if not line.endswith(b"\n") or len(line) < 10 or line[8:9] != b" ":
+        return None
+    payload = line[9:-1]
+    try:
+        checksum = int(line[:8], 16)
+    except ValueError:
+        return None
+    if zlib.crc32(payload) != checksum:
+        return None
+    try:
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+# Return the size of the journal up to the last complete record, anything after it was a torn write
+def valid_length(path: str):
+    length = 0
+    if not os.path.exists(path):
+        return length
+    with open(path, "rb") as f:
+        for line in f:
+            if decode_record(line) is None:
+                break
+            length += len(line)
+    return length
+
+
+# Read every complete record in the journal in the order it was written
+def read_records(path: str) -> Iterator[dict]:
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        for line in f:
+            record = decode_record(line)
+            if record is None:
+                return
+            yield record
+
+
+class Journal:
+    def __init__(self, path: str, durability: str = "fsync"):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError("Durability must be one of: " + ", ".join(DURABILITY_LEVELS))
+
+        self.path = path
+        self.durability = durability
+
+        # Cut off a torn record left by a crash so new records are not written after it
+        length = valid_length(path)
+        self.file = open(path, "ab")
+        if self.file.tell() != length:
+            self.file.truncate(length)
+            self.file.seek(length)
+
+        # Records waiting for the writer, and the sequence numbers that have been written and synced
+        self.lock = threading.Condition()
+        self.pending: List[bytes] = []
+        self.appended_seq = 0
+        self.written_seq = 0
+        self.synced_seq = 0
+        self.error: Optional[OSError] = None
+        self.closed = False
+
+        self.writer = threading.Thread(target=self.write_loop, name="journal-writer", daemon=True)
+        self.writer.start()
+
+    # Queue a change and return its sequence number, pass the number to wait() to make it durable
+    def append(self, record: dict):
+        line = encode_record(record)
+        with self.lock:
+            if self.closed:
+                raise ValueError("Journal is closed.")
+            if self.error:
+                raise self.error
+            self.pending.append(line)
+            self.appended_seq += 1
+            self.lock.notify_all()
+            return self.appended_seq
+
+    # Block until the change with this sequence number meets the journal's durability level
+    def wait(self, seq: int):
+        if self.durability == "none":
+            return
+        with self.lock:
+            while self.durable_seq() < seq and not self.error:
+                self.lock.wait()
+            if self.durable_seq() < seq:
+                raise self.error
+
+    # Append a change and wait for it
+    def commit(self, record: dict):
+        self.wait(self.append(record))
+
+    # Highest sequence number that meets the durability level
+    def durable_seq(self):
+        return self.synced_seq if self.durability == "fsync" else self.written_seq
+
+    # Background writer: take every waiting record, write them together and fsync once for the whole group
+    def write_loop(self):
+        while True:
+            with self.lock:
+                while not self.pending and not self.closed:
+                    self.lock.wait()
+                if not self.pending:
+                    return
+                batch = self.pending
+                self.pending = []
+                last = self.appended_seq
+
+            try:
+                self.file.write(b"".join(batch))
+                self.file.flush()
+                with self.lock:
+                    self.written_seq = last
+                    self.lock.notify_all()
+
+                if self.durability == "fsync":
+                    os.fsync(self.file.fileno())
+                with self.lock:
+                    self.synced_seq = last
+                    self.lock.notify_all()
+            except OSError as e:
+                with self.lock:
+                    self.error = e
+                    self.lock.notify_all()
+                return
+
+    # Write everything that is still waiting, fsync it and close the file
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.lock.notify_all()
+        self.writer.join()
+        if not self.error:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        self.file.close()
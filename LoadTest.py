@@ -0,0 +1,440 @@
+# Geraldine Whitaker
+# This file records menu sessions as operation traces, generates synthetic traces with a chosen mix of
+# logins, searches, intakes, reservations and training updates, and replays traces against Algorithms and
+# AuthSystem from many concurrent virtual users to report throughput, latency and error rates.
+#
+# Usage:
+#   python Driver.py --record session.jsonl
+#   python LoadTest.py generate trace.jsonl --ops 20000 --users 50 --mix search=6,reserve=2,login=1
+#   python LoadTest.py replay trace.jsonl --users 50 --rate 2000 --animals 5000
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+from Algorithms import Algorithms
+from Dog import Dog
+from Journal import Journal
+from Monkey import Monkey
+from RescueAnimal import RescueAnimal
+from Security import AuthSystem
+
+
+# Operations that can appear in a trace and the default mix used for synthetic traces
+OPERATIONS = ("login", "search", "intake", "reserve", "advance")
+DEFAULT_MIX = {"login": 1, "search": 6, "intake": 1, "reserve": 1, "advance": 1}
+
+# Passwords used to replay logins, traces only record the username and whether the login worked
+DEFAULT_CREDENTIALS = {"admin": "AdminPass", "customer": "CustomerPass"}
+
+DOG_BREEDS = ["German Shepherd", "Great Dane", "Chihuahua", "Labrador Retriever", "Beagle"]
+COUNTRIES = ["United States", "Canada", "Mexico", "Brazil"]
+
+
+# Write trace entries as JSON lines while a session runs
+class TraceRecorder:
+    def __init__(self, path: str, user: int = 0):
+        self.file = open(path, "a", encoding="utf-8")
+        self.user = user
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def record(self, op: str, **fields):
+        entry = {"user": self.user, "t": round(time.perf_counter() - self.start, 6), "op": op}
+        entry.update(fields)
+        with self.lock:
+            self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+# Return the trace fields for an intake
+def intake_fields(animal: RescueAnimal):
+    return {"kind": "dog" if isinstance(animal, Dog) else "monkey", "record": animal.to_record()}
+
+
+# Return True if a reservation or training message reports that the change was made
+def succeeded(op: str, message: str):
+    if op == "reserve":
+        return message.endswith(" has been reserved.")
+    return " advanced from " in message
+
+
+# Stands in for Algorithms in the driver and records every traced call with whether it succeeded, so a
+# replay can tell a rejected reservation from one that was made
+class RecordingAlgorithms:
+    def __init__(self, alg: Algorithms, recorder: TraceRecorder):
+        self.alg = alg
+        self.recorder = recorder
+
+    def __getattr__(self, attr: str):
+        return getattr(self.alg, attr)
+
+    def search(self, **filters):
+        self.recorder.record("search", filters=filters)
+        return self.alg.search(**filters)
+
+    def add_animal(self, animal: RescueAnimal):
+        fields = intake_fields(animal)
+        try:
+            result = self.alg.add_animal(animal)
+        except ValueError:
+            self.recorder.record("intake", ok=False, **fields)
+            raise
+        self.recorder.record("intake", ok=True, **fields)
+        return result
+
+    def reserve_by_name(self, name: str):
+        message = self.alg.reserve_by_name(name)
+        self.recorder.record("reserve", name=name, ok=succeeded("reserve", message))
+        return message
+
+    def advance_training(self, name: str):
+        message = self.alg.advance_training(name)
+        self.recorder.record("advance", name=name, ok=succeeded("advance", message))
+        return message
+
+
+# Stands in for AuthSystem and records logins without the password
+class RecordingAuthSystem:
+    def __init__(self, auth: AuthSystem, recorder: TraceRecorder):
+        self.auth = auth
+        self.recorder = recorder
+
+    def __getattr__(self, attr: str):
+        return getattr(self.auth, attr)
+
+    def authenticate(self, username: str, password: str):
+        user = self.auth.authenticate(username, password)
+        self.recorder.record("login", username=username.strip(), ok=user is not None)
+        return user
+
+    # Same prompt as AuthSystem, but the attempts go through the recorded authenticate()
+    def login_prompt(self, max_attempts: int = 3):
+        return AuthSystem.login_prompt(self, max_attempts)
+
+
+# Read a trace written by TraceRecorder or generate_trace()
+def load_trace(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_trace(path: str, trace: List[dict]):
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in trace:
+            f.write(json.dumps(entry) + "\n")
+
+
+# Parse a mix like "search=6,reserve=2" into operation weights
+def parse_mix(text: str):
+    mix: Dict[str, float] = {}
+    for part in text.split(","):
+        op, _, weight = part.partition("=")
+        op = op.strip()
+        if op not in OPERATIONS:
+            raise ValueError("Operation must be one of: " + ", ".join(OPERATIONS))
+        mix[op] = float(weight)
+    return mix
+
+
+# Return the name of the i-th synthetic animal
+def synthetic_name(i: int):
+    return f"Animal{i}"
+
+
+# Build a registry with the driver's sample animals plus "count" synthetic animals
+def build_registry(count: int, seed: int = 0, journal: Optional[Journal] = None):
+    import Driver
+
+    rng = random.Random(seed)
+    dogs = [Dog.from_record(d.to_record()) for d in Driver.dog_list]
+    monkeys = [Monkey.from_record(m.to_record()) for m in Driver.monkey_list]
+    statuses = RescueAnimal.ALLOWED_STATUSES
+
+    for i in range(count):
+        shared = {
+            "name": synthetic_name(i),
+            "gender": rng.choice(("male", "female")),
+            "age": rng.randint(1, 15),
+            "weight": round(rng.uniform(2, 60), 1),
+            "acquisition_date": f"{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}-{rng.randint(2000, 2024)}",
+            "acquisition_country": rng.choice(COUNTRIES),
+            "training_status": rng.choice(statuses),
+            "reserved": rng.random() < 0.2,
+            "in_service_country": rng.choice(COUNTRIES),
+        }
+        if i % 2 == 0:
+            dogs.append(Dog(breed=rng.choice(DOG_BREEDS), **shared))
+        else:
+            monkeys.append(Monkey(
+                species=rng.choice(Monkey.ALLOWED_SPECIES), tail_length=round(rng.uniform(5, 40), 1),
+                height=round(rng.uniform(10, 60), 1), body_length=round(rng.uniform(10, 70), 1), **shared
+            ))
+
+    return Algorithms(dogs, monkeys, indexed_fields=("name", "acquisition_date"), journal=journal)
+
+
+# Generate a synthetic trace of "ops" operations spread over "users" virtual users, for the registry that
+# build_registry(animals, seed) returns. Every animal belongs to one virtual user, who only reserves or
+# advances its own animals, so the targets picked here can still succeed when users run concurrently:
+# reservations go to animals in service and unreserved, training updates to animals not yet in service.
+# When a user has no such animal left the operation becomes a search. Intakes use new unique names.
+def generate_trace(ops: int, users: int, mix: Optional[Dict[str, float]] = None, animals: int = 1000,
+                   seed: int = 0):
+    mix = mix or DEFAULT_MIX
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[op] for op in names]
+    trace: List[dict] = []
+
+    # Reservable animals and animals still in training for each user, tracked as the trace advances them
+    reservable: List[List[str]] = [[] for _ in range(users)]
+    training: List[List[str]] = [[] for _ in range(users)]
+    status: Dict[str, str] = {}
+    reserved: Dict[str, bool] = {}
+    registry = build_registry(animals, seed)
+    for i, animal in enumerate(registry.dogs + registry.monkeys):
+        status[animal.name] = animal.training_status
+        reserved[animal.name] = animal.reserved
+        if animal.is_reservable():
+            reservable[i % users].append(animal.name)
+        elif animal.training_status != "in service":
+            training[i % users].append(animal.name)
+
+    for i in range(ops):
+        user = i % users
+        op = rng.choices(names, weights)[0]
+        if op == "reserve" and not reservable[user] or op == "advance" and not training[user]:
+            op = "search"
+        entry = {"user": user, "op": op}
+
+        if op == "login":
+            username = rng.choice(list(DEFAULT_CREDENTIALS))
+            entry.update(username=username, ok=rng.random() < 0.95)
+        elif op == "search":
+            entry["filters"] = random_filters(rng)
+        elif op == "intake":
+            entry.update(kind="dog", record={
+                "name": f"Load{user}-{i}", "breed": rng.choice(DOG_BREEDS), "gender": "female",
+                "age": rng.randint(1, 10), "weight": 20.0, "acquisition_date": "01-15-2024",
+                "acquisition_country": rng.choice(COUNTRIES), "training_status": "intake",
+                "reserved": False, "in_service_country": rng.choice(COUNTRIES)
+            })
+            entry["ok"] = True
+        elif op == "reserve":
+            name = take(rng, reservable[user])
+            reserved[name] = True
+            entry.update(name=name, ok=True)
+        else:
+            name = rng.choice(training[user])
+            status[name] = RescueAnimal.UPDATE_STATUS[status[name]]
+            if status[name] == "in service":
+                training[user].remove(name)
+                if not reserved[name]:
+                    reservable[user].append(name)
+            entry.update(name=name, ok=True)
+
+        trace.append(entry)
+
+    return trace
+
+
+# Remove and return a random name from a list by swapping it with the last one
+def take(rng: random.Random, names: List[str]):
+    i = rng.randrange(len(names))
+    names[i], names[-1] = names[-1], names[i]
+    return names.pop()
+
+
+# Pick a random combination of search filters like a customer browsing the menu would
+def random_filters(rng: random.Random):
+    filters: dict = {}
+    if rng.random() < 0.6:
+        filters["species_or_type"] = rng.choice(["dog", "monkey"] + DOG_BREEDS[:2] + Monkey.ALLOWED_SPECIES[:2])
+    if rng.random() < 0.5:
+        filters["reserved"] = False
+    if rng.random() < 0.3:
+        filters["training_status"] = rng.choice(RescueAnimal.ALLOWED_STATUSES)
+    if rng.random() < 0.3:
+        filters["in_service_country"] = rng.choice(COUNTRIES)
+    if rng.random() < 0.4:
+        filters["order_by"] = rng.choice(["age", "-acquisition_date", "weight", "name"])
+        filters["limit"] = 20
+    return filters
+
+
+# Run one trace entry and return whether it succeeded: the login worked, the intake was accepted, or the
+# reservation or training update was made. Searches always succeed.
+def run_operation(alg: Algorithms, auth: AuthSystem, credentials: Dict[str, str], entry: dict):
+    op = entry["op"]
+    if op == "login":
+        password = credentials.get(entry["username"], "") if entry.get("ok", True) else "wrong password"
+        return auth.authenticate(entry["username"], password) is not None
+    if op == "search":
+        alg.search(**entry.get("filters", {}))
+        return True
+    if op == "intake":
+        animal_type = Dog if entry["kind"] == "dog" else Monkey
+        try:
+            alg.add_animal(animal_type(**entry["record"]))
+        except ValueError:
+            return False
+        return True
+    if op == "reserve":
+        return succeeded(op, alg.reserve_by_name(entry["name"]))
+    if op == "advance":
+        return succeeded(op, alg.advance_training(entry["name"]))
+    raise ValueError(f"Unknown operation: {op}")
+
+
+# Return the value at a percentile of sorted latencies using the nearest rank, the smallest value with at
+# least pct percent of the values at or below it
+def percentile(ordered: List[float], pct: float):
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+# (sample size, percentile, expected nearest-rank value) for the samples 1..n
+KNOWN_PERCENTILES = [(1, 50, 1), (3, 50, 2), (10, 50, 5), (10, 90, 9), (10, 99, 10), (100, 50, 50),
+                     (100, 90, 90), (100, 99, 99), (100, 100, 100), (1000, 99, 990)]
+
+
+# Check percentile against known nearest-rank values and raise on the first mismatch
+def check_percentile():
+    for n, pct, expected in KNOWN_PERCENTILES:
+        got = percentile([float(v) for v in range(1, n + 1)], pct)
+        if got != expected:
+            raise AssertionError(f"p{pct} of 1..{n} should be {expected}, got {got}")
+
+
+# Replay a trace from "users" concurrent virtual users. Entries keep their order per virtual user. With a
+# rate, operations are scheduled at fixed intervals across all users and latency is measured from the
+# scheduled time, so a virtual user that falls behind shows the delay instead of hiding it.
+def replay(trace: List[dict], alg: Algorithms, auth: AuthSystem, users: int = 10, rate: Optional[float] = None,
+           credentials: Optional[Dict[str, str]] = None):
+    credentials = credentials or DEFAULT_CREDENTIALS
+    queues: List[List[tuple]] = [[] for _ in range(users)]
+    for i, entry in enumerate(trace):
+        offset = i / rate if rate else 0.0
+        queues[entry.get("user", i) % users].append((offset, entry))
+
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+    start = time.perf_counter() + 0.05
+
+    def virtual_user(queue: List[tuple]):
+        local_latencies: Dict[str, List[float]] = {}
+        local_errors: Dict[str, int] = {}
+        for offset, entry in queue:
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            began = scheduled if rate else time.perf_counter()
+
+            op = entry["op"]
+            # An operation is an error when it raises or its outcome differs from the recorded one. Entries
+            # without a recorded outcome are expected to succeed.
+            try:
+                ok = run_operation(alg, auth, credentials, entry) == entry.get("ok", True)
+            except Exception:
+                ok = False
+            local_latencies.setdefault(op, []).append(time.perf_counter() - began)
+            if not ok:
+                local_errors[op] = local_errors.get(op, 0) + 1
+
+        with lock:
+            for op, values in local_latencies.items():
+                latencies.setdefault(op, []).extend(values)
+            for op, count in local_errors.items():
+                errors[op] = errors.get(op, 0) + count
+
+    threads = [threading.Thread(target=virtual_user, args=(q,)) for q in queues if q]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    report = {}
+    for op in sorted(latencies) + ["total"]:
+        values = sorted(latencies[op]) if op != "total" else sorted(v for vs in latencies.values() for v in vs)
+        failed = errors.get(op, 0) if op != "total" else sum(errors.values())
+        report[op] = {
+            "count": len(values),
+            "throughput": len(values) / elapsed,
+            "error_rate": failed / len(values) if values else 0.0,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p90_ms": percentile(values, 90) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": (values[-1] if values else 0.0) * 1000,
+        }
+    return report
+
+
+# Print a replay report as a table
+def print_report(report: Dict[str, dict]):
+    print("\nOperation | Count | Ops/sec | Error Rate | p50 ms | p90 ms | p99 ms | Max ms")
+    print("-" * 80)
+    for op, row in report.items():
+        print(
+            f"{op} | {row['count']} | {row['throughput']:.0f} | {row['error_rate']:.2%} | "
+            f"{row['p50_ms']:.3f} | {row['p90_ms']:.3f} | {row['p99_ms']:.3f} | {row['max_ms']:.3f}"
+        )
+    print("")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and replay operation traces for the rescue system.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="write a synthetic trace")
+    generate.add_argument("trace")
+    generate.add_argument("--ops", type=int, default=10000)
+    generate.add_argument("--users", type=int, default=20)
+    generate.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    generate.add_argument("--animals", type=int, default=1000)
+    generate.add_argument("--seed", type=int, default=0)
+
+    run = commands.add_parser("replay", help="replay a recorded or synthetic trace")
+    run.add_argument("trace")
+    run.add_argument("--users", type=int, default=20)
+    run.add_argument("--rate", type=float, default=None, help="target operations per second, default is unlimited")
+    run.add_argument("--animals", type=int, default=1000)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--journal", default=None, help="journal changes to this file while replaying")
+    run.add_argument("--durability", default="fsync")
+
+    commands.add_parser("check", help="check the percentile math against known values")
+
+    args = parser.parse_args()
+    if args.command == "check":
+        check_percentile()
+        print(f"All {len(KNOWN_PERCENTILES)} percentile checks passed.")
+        return
+    if args.command == "generate":
+        save_trace(args.trace, generate_trace(args.ops, args.users, args.mix, args.animals, args.seed))
+        print(f"Wrote {args.ops} operations to {args.trace}.")
+        return
+
+    journal = Journal(args.journal, args.durability) if args.journal else None
+    try:
+        alg = build_registry(args.animals, args.seed, journal)
+        print_report(replay(load_trace(args.trace), alg, AuthSystem(), args.users, args.rate))
+    finally:
+        if journal:
+            journal.close()
+
+
+if __name__ == "__main__":
+    main()
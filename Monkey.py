@@ -8,6 +8,9 @@ from RescueAnimal import RescueAnimal
 class Monkey(RescueAnimal):
     ALLOWED_SPECIES = ["Capuchin", "Guenon", "Marmoset", "Squirrel Monkey", "Tamarin", "Macaque"]
 
+    # Lowercase species names for constant time case-insensitive lookups
+    SPECIES_LOOKUP = frozenset(s.lower() for s in ALLOWED_SPECIES)
+
     def __init__(
         self,
         name: str,
@@ -43,17 +46,55 @@ class Monkey(RescueAnimal):
             in_service_country=in_service_country
         )
 
+        self.check_monkey_fields(vars(self), vars(self))
+
+    # Validate the monkey-specific fields of a row and store them normalized in record
+    @classmethod
+    def check_monkey_fields(cls, row: dict, record: dict):
+
         # Validate species is not empty and is on the allowed species list
-        self.species = self.species.strip()
-        if not self.species:
+        species = row["species"]
+        species = species.strip() if isinstance(species, str) else ""
+        if not species:
             raise ValueError("Species cannot be empty.")
-        if not any(self.species.lower() == s.lower() for s in self.ALLOWED_SPECIES):
-            raise ValueError("Species must be one of: " + ", ".join(self.ALLOWED_SPECIES))
+        if species.lower() not in cls.SPECIES_LOOKUP:
+            raise ValueError("Species must be one of: " + ", ".join(cls.ALLOWED_SPECIES))
 
         # Validate all measurements are greater than 0
-        if self.tail_length <= 0:
+        tail_length, height, body_length = row["tail_length"], row["height"], row["body_length"]
+        if not isinstance(tail_length, (int, float)) or tail_length <= 0:
             raise ValueError("Tail length must be greater than 0.")
-        if self.height <= 0:
+        if not isinstance(height, (int, float)) or height <= 0:
             raise ValueError("Height must be greater than 0.")
-        if self.body_length <= 0:
+        if not isinstance(body_length, (int, float)) or body_length <= 0:
             raise ValueError("Body length must be greater than 0.")
+
+        record["species"] = species
+        record["tail_length"] = tail_length
+        record["height"] = height
+        record["body_length"] = body_length
+
+    # Validate every field of a monkey record, the same checks the constructor runs
+    @classmethod
+    def check_record(cls, row: dict):
+        record = cls.check_shared(row)
+        cls.check_monkey_fields(row, record)
+        return record
+
+    # Return the constructor arguments for this monkey
+    def to_record(self):
+        return {
+            "name": self.name,
+            "species": self.species,
+            "gender": self.gender,
+            "age": self.age,
+            "weight": self.weight,
+            "acquisition_date": self.acquisition_date,
+            "acquisition_country": self.acquisition_country,
+            "training_status": self.training_status,
+            "reserved": self.reserved,
+            "in_service_country": self.in_service_country,
+            "tail_length": self.tail_length,
+            "height": self.height,
+            "body_length": self.body_length
+        }
@@ -34,55 +34,93 @@ class RescueAnimal:
     reserved: bool
     in_service_country: str
 
+    # Sets for constant time lookups during validation
+    GENDERS: ClassVar[frozenset] = frozenset(("male", "female"))
+    STATUS_LOOKUP: ClassVar[frozenset] = frozenset(ALLOWED_STATUSES)
+
     def __post_init__(self):
+        vars(self).update(self.check_shared(vars(self)))
+
+    # Validate the shared fields of a record and return them normalized. The constructors and
+    # Validation.validate both use this, so untrusted rows follow the same rules as new animals.
+    @classmethod
+    def check_shared(cls, row: dict):
 
         # Validate Name is not empty
-        self.name = self.name.strip()
-        if not self.name:
+        name = row["name"]
+        name = name.strip() if isinstance(name, str) else ""
+        if not name:
             raise ValueError("Name cannot be empty.")
 
         # Validate gender is not empty and is either "male" or "female"
-        self.gender = self.gender.strip().lower()
-        if not self.gender:
+        gender = row["gender"]
+        gender = gender.strip().lower() if isinstance(gender, str) else ""
+        if not gender:
             raise ValueError("Gender cannot be empty.")
-        if self.gender not in ("male", "female"):
+        if gender not in cls.GENDERS:
             raise ValueError("Gender must be 'male' or 'female'.")
 
         # Validate age is an integer that is greater than 0
-        if not isinstance(self.age, int) or self.age <= 0:
+        age = row["age"]
+        if not isinstance(age, int) or age <= 0:
             raise ValueError("Age must be a greater than 0.")
 
         # Validate weight is either an integer or float that is greater than 0
-        if not isinstance(self.weight, (int, float)) or float(self.weight) <= 0:
+        weight = row["weight"]
+        if not isinstance(weight, (int, float)) or weight <= 0:
             raise ValueError("Weight must be greater than 0.")
-        self.weight = float(self.weight)
 
         # Validate acquisition date format (MM-DD-YYYY)
-        self.acquisition_date = self.acquisition_date.strip()
-        if not self.valid_date(self.acquisition_date):
+        acquisition_date = row["acquisition_date"]
+        acquisition_date = acquisition_date.strip() if isinstance(acquisition_date, str) else ""
+        if not cls.valid_date(acquisition_date):
             raise ValueError("Acquisition date must be in MM-DD-YYYY format.")
 
         # Validate acquisition country is not empty
-        self.acquisition_country = self.acquisition_country.strip()
-        if not self.acquisition_country:
+        acquisition_country = row["acquisition_country"]
+        acquisition_country = acquisition_country.strip() if isinstance(acquisition_country, str) else ""
+        if not acquisition_country:
             raise ValueError("Acquisition country cannot be empty.")
 
         # Validate training status is one of the allowed statuses
-        self.training_status = self.training_status.strip()
-        if self.training_status not in self.ALLOWED_STATUSES:
+        training_status = row["training_status"]
+        training_status = training_status.strip() if isinstance(training_status, str) else None
+        if training_status not in cls.STATUS_LOOKUP:
             raise ValueError(
-                "Training status must be one of: " + ", ".join(self.ALLOWED_STATUSES)
+                "Training status must be one of: " + ", ".join(cls.ALLOWED_STATUSES)
             )
 
         # Validate in-service country is not empty
-        self.in_service_country = self.in_service_country.strip()
-        if not self.in_service_country:
+        in_service_country = row["in_service_country"]
+        in_service_country = in_service_country.strip() if isinstance(in_service_country, str) else ""
+        if not in_service_country:
             raise ValueError("In service country cannot be empty.")
 
         # Validate reserved status
-        if not isinstance(self.reserved, bool):
+        reserved = row["reserved"]
+        if reserved is not True and reserved is not False:
             raise ValueError("Reserved must be True or False")
 
+        return {
+            "name": name,
+            "gender": gender,
+            "age": age,
+            "weight": float(weight),
+            "acquisition_date": acquisition_date,
+            "acquisition_country": acquisition_country,
+            "training_status": training_status,
+            "reserved": reserved,
+            "in_service_country": in_service_country
+        }
+
+    # Build an animal from a record that was already validated, such as one read back from the journal.
+    # Validation is skipped, so the record must hold exactly the values to_record() returns.
+    @classmethod
+    def from_record(cls, record: dict):
+        animal = cls.__new__(cls)
+        vars(animal).update(record)
+        return animal
+
     # Only animals in service and not already reserved are eligible to be reserved
     def is_reservable(self):
         return self.training_status == "in service" and self.reserved is False
@@ -99,17 +137,12 @@ class RescueAnimal:
         self.training_status = self.next_training_status()
 
     @staticmethod
-    # Ensures that acquisition date is valid and in correct format
+    # Ensures that acquisition date is valid and in correct format, splitting the date in one pass
     def valid_date(value: str):
-        parts = value.split("-")
-        if len(parts) != 3:
+        mm, _, rest = value.partition("-")
+        dd, separator, yyyy = rest.partition("-")
+        if not separator or len(yyyy) != 4:
             return False
-        mm, dd, yyyy = parts
         if not (mm.isdigit() and dd.isdigit() and yyyy.isdigit()):
             return False
-        if len(yyyy) != 4:
-            return False
-        m = int(mm)
-        d = int(dd)
-        y = int(yyyy)
-        return 1 <= m <= 12 and 1 <= d <= 31 and y > 1970
+        return 1 <= int(mm) <= 12 and 1 <= int(dd) <= 31 and int(yyyy) > 1970
@@ -0,0 +1,194 @@
+# Geraldine Whitaker
+# This file finds animals with similar physical attributes. Each kind of animal has a KD-tree over its numeric
+# features scaled by their standard deviation, so k-nearest queries only visit the parts of the tree that
+# can still hold a closer animal instead of comparing against every animal.
+
+import heapq
+import math
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from Dog import Dog
+from RescueAnimal import RescueAnimal
+
+
+# Numeric features compared for each kind of animal
+FEATURES: Dict[str, Tuple[str, ...]] = {
+    "dog": ("age", "weight"),
+    "monkey": ("tail_length", "height", "body_length", "weight"),
+}
+
+
+# Return "dog" or "monkey" for an animal
+def animal_kind(animal: RescueAnimal):
+    return "dog" if isinstance(animal, Dog) else "monkey"
+
+
+class KDNode:
+    __slots__ = ("key", "point", "axis", "left", "right", "deleted")
+
+    def __init__(self, key: str, point: Tuple[float, ...], axis: int):
+        self.key = key
+        self.point = point
+        self.axis = axis
+        self.left: Optional["KDNode"] = None
+        self.right: Optional["KDNode"] = None
+        self.deleted = False
+
+
+# KD-tree keyed by animal name. Inserts walk down to a leaf, removals mark the node as deleted, and the
+# tree is rebuilt balanced when it has doubled in size or half of it is deleted.
+class KDTree:
+    def __init__(self, dims: int):
+        self.dims = dims
+        self.root: Optional[KDNode] = None
+        self.nodes: Dict[str, KDNode] = {}
+        self.deleted = 0
+        self.built_size = 0
+
+    def __len__(self):
+        return len(self.nodes)
+
+    # Build a balanced tree by splitting on the median of each axis in turn
+    def build(self, points: Dict[str, Tuple[float, ...]]):
+        self.nodes = {}
+        self.deleted = 0
+        self.built_size = len(points)
+        self.root = self.build_subtree(list(points.items()), 0)
+
+    def build_subtree(self, items: List[Tuple[str, Tuple[float, ...]]], depth: int):
+        if not items:
+            return None
+        axis = depth % self.dims
+        items.sort(key=lambda item: item[1][axis])
+        middle = len(items) // 2
+        key, point = items[middle]
+        node = KDNode(key, point, axis)
+        self.nodes[key] = node
+        node.left = self.build_subtree(items[:middle], depth + 1)
+        node.right = self.build_subtree(items[middle + 1:], depth + 1)
+        return node
+
+    # Add a point below the leaf it belongs under
+    def insert(self, key: str, point: Tuple[float, ...]):
+        if key in self.nodes:
+            self.remove(key)
+
+        if self.root is None:
+            self.root = KDNode(key, point, 0)
+            self.nodes[key] = self.root
+            return
+
+        node = self.root
+        while True:
+            branch = "left" if point[node.axis] < node.point[node.axis] else "right"
+            child = getattr(node, branch)
+            if child is None:
+                child = KDNode(key, point, (node.axis + 1) % self.dims)
+                setattr(node, branch, child)
+                self.nodes[key] = child
+                return
+            node = child
+
+    # Mark a point as deleted, it stays in the tree as a split point until the next rebuild
+    def remove(self, key: str):
+        node = self.nodes.pop(key, None)
+        if node is not None:
+            node.deleted = True
+            self.deleted += 1
+
+    # True when inserts or removals have drifted far enough from the last balanced build
+    def needs_rebuild(self):
+        return len(self.nodes) > 2 * max(self.built_size, 16) or self.deleted > max(len(self.nodes), 16)
+
+    # Return up to k (distance, key) pairs closest to the point, nearest first. Only keys that pass
+    # accept are returned, but every node still guides the search.
+    def nearest(self, point: Sequence[float], k: int, accept: Callable[[str], bool]):
+        if k <= 0:
+            return []
+
+        best: List[Tuple[float, str]] = []
+        stack: List[Tuple[Optional[KDNode], float]] = [(self.root, 0.0)]
+
+        while stack:
+            node, plane_distance = stack.pop()
+            if node is None:
+                continue
+            if len(best) == k and plane_distance >= -best[0][0]:
+                continue
+
+            if not node.deleted and accept(node.key):
+                distance = sum((a - b) ** 2 for a, b in zip(point, node.point))
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, node.key))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, node.key))
+
+            diff = point[node.axis] - node.point[node.axis]
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            stack.append((far, diff * diff))
+            stack.append((near, plane_distance))
+
+        return [(math.sqrt(-d), key) for d, key in sorted(best, reverse=True)]
+
+
+# One KD-tree per kind of animal. Features are divided by their standard deviation so weight in pounds
+# does not outweigh tail length in inches. The scales are refreshed whenever a tree is rebuilt.
+class SimilarityIndex:
+    def __init__(self):
+        self.raw: Dict[str, Dict[str, Tuple[float, ...]]] = {kind: {} for kind in FEATURES}
+        self.scales: Dict[str, Tuple[float, ...]] = {kind: (1.0,) * len(f) for kind, f in FEATURES.items()}
+        self.trees: Dict[str, KDTree] = {kind: KDTree(len(f)) for kind, f in FEATURES.items()}
+
+    # Return the raw feature values for an animal
+    @staticmethod
+    def features(animal: RescueAnimal):
+        return tuple(float(getattr(animal, f)) for f in FEATURES[animal_kind(animal)])
+
+    def scale(self, kind: str, raw: Sequence[float]):
+        return tuple(v / s for v, s in zip(raw, self.scales[kind]))
+
+    # Index every animal from scratch
+    def build(self, animals: Sequence[RescueAnimal]):
+        for kind in FEATURES:
+            self.raw[kind] = {}
+        for animal in animals:
+            self.raw[animal_kind(animal)][animal.name.lower()] = self.features(animal)
+        for kind in FEATURES:
+            self.rebuild(kind)
+
+    # Recompute the feature scales for one kind of animal and rebuild its tree balanced
+    def rebuild(self, kind: str):
+        values = list(self.raw[kind].values())
+        scales = []
+        for i in range(len(FEATURES[kind])):
+            column = [v[i] for v in values]
+            mean = sum(column) / len(column) if column else 0.0
+            std = math.sqrt(sum((x - mean) ** 2 for x in column) / len(column)) if column else 0.0
+            scales.append(std if std > 0 else 1.0)
+        self.scales[kind] = tuple(scales)
+        self.trees[kind].build({key: self.scale(kind, raw) for key, raw in self.raw[kind].items()})
+
+    def add(self, animal: RescueAnimal):
+        kind = animal_kind(animal)
+        key = animal.name.lower()
+        raw = self.features(animal)
+        self.raw[kind][key] = raw
+        self.trees[kind].insert(key, self.scale(kind, raw))
+        if self.trees[kind].needs_rebuild():
+            self.rebuild(kind)
+
+    def remove(self, animal: RescueAnimal):
+        kind = animal_kind(animal)
+        key = animal.name.lower()
+        self.raw[kind].pop(key, None)
+        self.trees[kind].remove(key)
+        if self.trees[kind].needs_rebuild():
+            self.rebuild(kind)
+
+    # Return up to k (distance, name key) pairs of this kind closest to the raw feature values
+    def nearest(self, kind: str, raw: Sequence[float], k: int, accept: Callable[[str], bool]):
+        if kind not in FEATURES:
+            raise ValueError("Kind must be one of: " + ", ".join(FEATURES))
+        if len(raw) != len(FEATURES[kind]):
+            raise ValueError(f"A {kind} is compared on: " + ", ".join(FEATURES[kind]))
+        return self.trees[kind].nearest(self.scale(kind, raw), k, accept)
@@ -0,0 +1,44 @@
+# Geraldine Whitaker
+# This file validates untrusted animal records, such as imported rows, before they are turned into animals.
+# Rows are checked with the same check_record rules the Dog and Monkey constructors run, and a whole batch
+# of valid rows is then built with the trusted from_record path, which skips the constructor.
+
+from typing import List, Tuple
+
+from Dog import Dog
+from Monkey import Monkey
+
+
+ANIMAL_TYPES = {"dog": Dog, "monkey": Monkey}
+
+
+# Validate one row for a "dog" or "monkey" and return the normalized record. Fields the animal does not
+# have are left out of the record.
+def validate(kind: str, row: dict):
+    animal_type = ANIMAL_TYPES.get(kind)
+    if animal_type is None:
+        raise ValueError("We do not currently except this animal type.")
+    try:
+        return animal_type.check_record(row)
+    except KeyError as e:
+        raise ValueError(f"Missing field: {e.args[0]}")
+
+
+# Validate a batch of rows. Returns the normalized records and a list of (row number, error) for the rows
+# that failed.
+def validate_batch(kind: str, rows: List[dict]):
+    records: List[dict] = []
+    errors: List[Tuple[int, str]] = []
+    for i, row in enumerate(rows):
+        try:
+            records.append(validate(kind, row))
+        except ValueError as e:
+            errors.append((i, str(e)))
+    return records, errors
+
+
+# Validate a batch of rows and build the valid ones without validating them a second time
+def build_batch(kind: str, rows: List[dict]):
+    records, errors = validate_batch(kind, rows)
+    animal_type = ANIMAL_TYPES[kind]
+    return [animal_type.from_record(record) for record in records], errors